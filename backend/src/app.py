@@ -1,26 +1,21 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request, send_file, abort
 from flask_cors import CORS
-import duckdb
+from photos import thumbnail_file
+from dataset import get_cursor
+from queries import (AREAS_SQL, ROUTES_SQL, AREA_EXISTS_SQL, AREA_SUBTREE_SQL,
+                     AREA_ROUTES_SQL, AREA_ROUTES_RECURSIVE_SQL, fetch_records, iter_routes,
+                     is_recursive)
 
 app = Flask(__name__)
 CORS(app)
 
-# Connect to the DuckDB database
-conn = duckdb.connect('climbing.db')
-
 @app.route('/api/areas', methods=['GET'])
 def get_areas():
     try:
+        conn = get_cursor()
         # Execute query to get all areas with their routes
-        conn.execute('''
-            SELECT 
-                a.*,
-                COUNT(r.id) as route_count
-            FROM climbing_areas a
-            LEFT JOIN routes r ON r.area_id = a.id
-            GROUP BY a.id
-        ''')
-        areas = [dict(row) for row in conn.fetchall()]
+        conn.execute(AREAS_SQL)
+        areas = fetch_records(conn)
         
         return jsonify({'areas': areas})
     except Exception as e:
@@ -29,23 +24,54 @@ def get_areas():
 @app.route('/api/routes', methods=['GET'])
 def get_routes():
     try:
+        conn = get_cursor()
         # Get all routes with their photos
-        conn.execute('''
-            SELECT 
-                r.*,
-                array_agg(json_object(
-                    'url', p.url,
-                    'caption', p.caption
-                )) as photos
-            FROM routes r
-            LEFT JOIN route_photos p ON p.route_id = r.id
-            GROUP BY r.id
-        ''')
-        routes = [dict(row) for row in conn.fetchall()]
+        conn.execute(ROUTES_SQL)
+        routes = list(iter_routes(conn))
         
         return jsonify({'routes': routes})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/areas/<int:area_id>/subtree', methods=['GET'])
+def get_area_subtree(area_id):
+    try:
+        conn = get_cursor()
+        # The area and all of its sub-areas, with their depth below it
+        conn.execute(AREA_SUBTREE_SQL, {'area_id': area_id})
+        areas = fetch_records(conn)
+        if not areas:
+            return jsonify({'error': f'Area {area_id} not found'}), 404
+        
+        return jsonify({'areas': areas})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/areas/<int:area_id>/routes', methods=['GET'])
+def get_area_routes(area_id):
+    try:
+        conn = get_cursor()
+        if conn.execute(AREA_EXISTS_SQL, {'area_id': area_id}).fetchone() is None:
+            return jsonify({'error': f'Area {area_id} not found'}), 404
+        
+        # ?recursive=1 includes routes in sub-areas at any depth
+        sql = AREA_ROUTES_RECURSIVE_SQL if is_recursive(request.args) else AREA_ROUTES_SQL
+        conn.execute(sql, {'area_id': area_id})
+        routes = fetch_records(conn)
+        
+        return jsonify({'routes': routes})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/photos/<content_hash>/thumbnail', methods=['GET'])
+def get_photo_thumbnail(content_hash):
+    path = thumbnail_file(content_hash)
+    if path is None:
+        abort(404)
+    # Content-addressed, so the file behind a URL never changes
+    return send_file(path, mimetype='image/jpeg', max_age=31536000)
+
 if __name__ == '__main__':
+    # Queries run against an in-memory copy of the latest published snapshot,
+    # loaded and kept current from the first request on (see dataset.get_cursor)
     app.run(debug=True, port=5000)
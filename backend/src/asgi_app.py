@@ -0,0 +1,101 @@
+from contextlib import asynccontextmanager
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import FileResponse, Response, StreamingResponse
+from starlette.routing import Route
+from dataset import get_cursor, watch_snapshots
+from photos import thumbnail_file
+from queries import (AREAS_SQL, ROUTES_SQL, AREA_EXISTS_SQL, AREA_SUBTREE_SQL,
+                     AREA_ROUTES_SQL, AREA_ROUTES_RECURSIVE_SQL, iter_records,
+                     iter_routes, encode_json, is_recursive)
+
+# ASGI server for the same endpoints as app.py. Results are streamed from
+# DuckDB in batches so the first rows go out before the query is exhausted
+# and memory stays flat however large the table is. The endpoints are plain
+# functions, which Starlette runs in its threadpool, so executing a query
+# never blocks the event loop. Run with:
+#   uvicorn asgi_app:app --port 5000
+
+def stream_ndjson(records):
+    """One JSON object per line"""
+    for record in records:
+        yield encode_json(record) + b'\n'
+
+def stream_json_array(records, key):
+    """A {"<key>": [...]} document written out row by row"""
+    yield b'{"' + key.encode('utf-8') + b'":['
+    first = True
+    for record in records:
+        if not first:
+            yield b','
+        yield encode_json(record)
+        first = False
+    yield b']}'
+
+def error_response(message, status_code=500):
+    return Response(encode_json({'error': message}), status_code=status_code,
+                    media_type='application/json')
+
+def stream_query(request, sql, key, params=None, area_id=None, records=iter_records):
+    try:
+        cursor = get_cursor()
+        # Check the area up front, once streaming starts the status is sent
+        if area_id is not None:
+            if cursor.execute(AREA_EXISTS_SQL, {'area_id': area_id}).fetchone() is None:
+                return error_response(f'Area {area_id} not found', 404)
+        cursor.execute(sql, params)
+    except Exception as e:
+        return error_response(str(e))
+
+    # Sync generators are iterated in the threadpool too
+    if request.query_params.get('format') == 'ndjson':
+        return StreamingResponse(stream_ndjson(records(cursor)), media_type='application/x-ndjson')
+    return StreamingResponse(stream_json_array(records(cursor), key), media_type='application/json')
+
+def get_areas(request):
+    return stream_query(request, AREAS_SQL, 'areas')
+
+def get_routes(request):
+    return stream_query(request, ROUTES_SQL, 'routes', records=iter_routes)
+
+def get_area_subtree(request):
+    area_id = request.path_params['area_id']
+    return stream_query(request, AREA_SUBTREE_SQL, 'areas', {'area_id': area_id}, area_id)
+
+def get_area_routes(request):
+    area_id = request.path_params['area_id']
+    # ?recursive=1 includes routes in sub-areas at any depth
+    sql = AREA_ROUTES_RECURSIVE_SQL if is_recursive(request.query_params) else AREA_ROUTES_SQL
+    return stream_query(request, sql, 'routes', {'area_id': area_id}, area_id)
+
+def get_photo_thumbnail(request):
+    path = thumbnail_file(request.path_params['content_hash'])
+    if path is None:
+        return Response(status_code=404)
+    # Content-addressed, so the file behind a URL never changes
+    return FileResponse(path, media_type='image/jpeg',
+                        headers={'Cache-Control': 'public, max-age=31536000, immutable'})
+
+@asynccontextmanager
+async def lifespan(app):
+    # Queries run against an in-memory copy of the latest published snapshot.
+    # Start watching now rather than on the first request.
+    watch_snapshots()
+    yield
+
+app = Starlette(
+    routes=[
+        Route('/api/areas', get_areas, methods=['GET']),
+        Route('/api/routes', get_routes, methods=['GET']),
+        Route('/api/areas/{area_id:int}/subtree', get_area_subtree, methods=['GET']),
+        Route('/api/areas/{area_id:int}/routes', get_area_routes, methods=['GET']),
+        Route('/api/photos/{content_hash}/thumbnail', get_photo_thumbnail, methods=['GET']),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'])],
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, port=5000)
@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import duckdb
+from dataset import load_snapshot
+from queries import API_QUERIES, BATCH_SIZE, configure_connection
+from schema import migrate, add_area_to_closure
+from snapshots import current_version
+
+# Benchmarks the API queries with EXPLAIN ANALYZE and compares their plans
+# against query_plans.json, so a schema or query change that drops an index
+# or changes join strategy shows up before it ships. Run from backend/src:
+#   python bench_queries.py            check against the baseline
+#   python bench_queries.py --update   record a new baseline
+#   python bench_queries.py --snapshot use the published snapshot instead of
+#                                      synthetic data (don't --update with it)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_plans.json')
+RUNS = 5
+
+# Queries slower than this multiple of their baseline latency are reported
+SLOWDOWN_FACTOR = 2.0
+
+# Operators whose presence depends on column statistics rather than the plan
+IGNORED_OPERATORS = {'PROJECTION', 'EXPLAIN_ANALYZE'}
+
+def synthetic_database(top_areas=20, fanout=5, depth=3, routes_per_area=10):
+    """A deterministic in-memory dataset with the real schema: a tree of areas
+    with routes in every area and a photo on every other route"""
+    conn = duckdb.connect(':memory:')
+    migrate(conn)
+
+    areas = []
+    next_id = 1
+    level = []
+    for _ in range(top_areas):
+        areas.append((next_id, f'Area {next_id}', None))
+        level.append(next_id)
+        next_id += 1
+    for _ in range(depth - 1):
+        children = []
+        for parent in level:
+            for _ in range(fanout):
+                areas.append((next_id, f'Area {next_id}', parent))
+                children.append(next_id)
+                next_id += 1
+        level = children
+
+    conn.executemany('INSERT INTO climbing_areas (id, name, parent_area_id) VALUES (?, ?, ?)', areas)
+    for area_id, _, parent_id in areas:
+        add_area_to_closure(conn, area_id, parent_id)
+
+    routes = []
+    photos = []
+    for area, _, _ in areas:
+        for _ in range(routes_per_area):
+            route_id = len(routes) + 1
+            routes.append((route_id, area, f'Route {route_id}', '5.10a', 'sport', 60.0, 1))
+            if route_id % 2 == 0:
+                photos.append((len(photos) + 1, route_id, f'https://example.com/{route_id}.jpg'))
+
+    conn.executemany('''
+        INSERT INTO routes (id, area_id, name, grade, type, height, pitches)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', routes)
+    conn.executemany('INSERT INTO route_photos (id, route_id, url) VALUES (?, ?, ?)', photos)
+    return configure_connection(conn)
+
+def plan_signature(node):
+    """The operators of a profiled plan, depth first, with the table and scan
+    type for scans so a switch between index and sequential scans is caught"""
+    signature = []
+    operator = node.get('operator_type')
+    if operator and operator not in IGNORED_OPERATORS:
+        info = node.get('extra_info', {})
+        if 'Table' in info:
+            operator += f" {info['Table'].split('.')[-1]} ({info.get('Type', 'Scan')})"
+        signature.append(operator)
+    for child in node.get('children', []):
+        signature.extend(plan_signature(child))
+    return signature
+
+def profile_query(conn, sql, params):
+    """Run a query under EXPLAIN ANALYZE a few times. Returns its plan
+    signature and median latency in milliseconds."""
+    latencies = []
+    for _ in range(RUNS):
+        profile = json.loads(conn.execute('EXPLAIN (ANALYZE, FORMAT json) ' + sql, params).fetchall()[0][1])
+        latencies.append(profile['latency'] * 1000)
+    return plan_signature(profile), statistics.median(latencies)
+
+def query_params(conn, sql):
+    """Sample values for the named parameters a query uses"""
+    params = {}
+    if '$area_id' in sql:
+        params['area_id'] = conn.execute('''
+            SELECT id FROM climbing_areas WHERE parent_area_id IS NULL ORDER BY id LIMIT 1
+        ''').fetchone()[0]
+    if '$route_ids' in sql:
+        # The first batch iter_routes would look photos up for
+        params['route_ids'] = conn.execute('''
+            SELECT list(id)::VARCHAR FROM (SELECT id FROM routes LIMIT ?)
+        ''', [BATCH_SIZE]).fetchone()[0]
+    return params
+
+def main():
+    parser = argparse.ArgumentParser(description='Check API query plans against the baseline')
+    parser.add_argument('--update', action='store_true', help='record the results as the new baseline')
+    parser.add_argument('--snapshot', action='store_true', help='benchmark the published snapshot')
+    args = parser.parse_args()
+
+    if args.snapshot:
+        version = current_version()
+        if version is None:
+            sys.exit('No snapshot has been published yet')
+        conn = load_snapshot(version)
+    else:
+        conn = synthetic_database()
+
+    try:
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {'duckdb_version': duckdb.__version__, 'queries': {}}
+
+    # Operator names and plan choices differ between DuckDB releases, so a
+    # baseline only means something for the version it was recorded with
+    if baseline.get('duckdb_version') != duckdb.__version__ and not args.update:
+        sys.exit(f"Baseline was recorded with DuckDB {baseline.get('duckdb_version')} but "
+                 f"{duckdb.__version__} is installed, install the version pinned in "
+                 f"requirements.txt or re-record with --update")
+
+    results = {}
+    regressions = 0
+    for name, sql in API_QUERIES.items():
+        plan, latency = profile_query(conn, sql, query_params(conn, sql))
+        results[name] = {'plan': plan, 'latency_ms': round(latency, 3)}
+        print(f"{name}: {latency:.2f} ms")
+        print('  ' + ' <- '.join(plan))
+
+        expected = baseline.get('queries', {}).get(name)
+        if expected is None or args.update:
+            continue
+        if plan != expected['plan']:
+            regressions += 1
+            print(f"  PLAN CHANGED, baseline was:\n  " + ' <- '.join(expected['plan']))
+        elif latency > expected['latency_ms'] * SLOWDOWN_FACTOR:
+            print(f"  Slower than baseline ({expected['latency_ms']:.2f} ms)")
+
+    if args.update:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump({'duckdb_version': duckdb.__version__, 'queries': results}, f, indent=2)
+            f.write('\n')
+        print(f"Wrote baseline for {len(results)} queries to {BASELINE_PATH}")
+    elif regressions:
+        sys.exit(f"{regressions} query plan(s) changed")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import duckdb
+import threading
+import time
+from queries import configure_connection
+from schema import migrate
+from snapshots import current_version, snapshot_path
+
+# How often the API checks for a newly published snapshot, in seconds
+RELOAD_INTERVAL = 30
+
+# The serving dataset: the current snapshot copied into an in-memory DuckDB
+# database. Requests grab whatever connection is current and never touch disk.
+dataset_conn = None
+dataset_version = None
+_reload_lock = threading.Lock()
+_watcher = None
+
+def load_snapshot(version):
+    """Copy a published snapshot into a fresh in-memory database and bring
+    it up to the current schema"""
+    mem = duckdb.connect(':memory:')
+    mem.execute(f"ATTACH '{snapshot_path(version)}' AS snap (READ_ONLY)")
+    mem.execute('COPY FROM DATABASE snap TO memory')
+    mem.execute('DETACH snap')
+
+    # Snapshots published by an older crawler are migrated in memory, e.g.
+    # area_closure is backfilled from the parent links. Ones from before
+    # schema migrations existed can't be, they need a new crawl.
+    if mem.execute("SELECT 1 FROM duckdb_tables() WHERE table_name = 'schema_version'").fetchone() is None:
+        mem.close()
+        raise RuntimeError(f'Snapshot {version} predates schema migrations, run the scraper to publish a new one')
+    migrate(mem)
+    return configure_connection(mem)
+
+def refresh_dataset():
+    """Load the current snapshot if it differs from the one being served.
+    The old dataset stays live until the new one is fully loaded."""
+    global dataset_conn, dataset_version
+    with _reload_lock:
+        version = current_version()
+        if version is None or version == dataset_version:
+            return False
+        new_conn = load_snapshot(version)
+        # A single reference swap, so readers see either the old or the new
+        # dataset. In-flight cursors keep the old one alive until they finish.
+        dataset_conn, dataset_version = new_conn, version
+        print(f"Serving snapshot {version}")
+        return True
+
+def get_cursor():
+    """A cursor on the serving dataset for the current request. The first
+    call loads the dataset and starts the watcher, so only a process that
+    actually serves requests does either (not the debug reloader's parent)."""
+    conn = dataset_conn
+    if conn is None or _watcher is None:
+        refresh_dataset()
+        watch_snapshots()
+        conn = dataset_conn
+        if conn is None:
+            raise RuntimeError('No snapshot has been published yet')
+    return conn.cursor()
+
+def watch_snapshots(interval=RELOAD_INTERVAL):
+    """Start the background thread that swaps in newly published snapshots,
+    once per process"""
+    global _watcher
+
+    def watch():
+        while True:
+            try:
+                refresh_dataset()
+            except Exception as e:
+                print(f"Error loading snapshot: {str(e)}")
+            time.sleep(interval)
+
+    with _reload_lock:
+        if _watcher is None:
+            _watcher = threading.Thread(target=watch, daemon=True)
+            _watcher.start()
+        return _watcher
@@ -0,0 +1,125 @@
+import duckdb
+import json
+import os
+import shutil
+from photos import PHOTO_STORE_DIR, thumbnail_file
+from queries import AREAS_SQL, ROUTES_SQL, fetch_records, iter_routes
+from snapshots import snapshot_path
+
+# The frontend serves the full dataset from here, with versioned deltas in data/
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'frontend', 'public')
+FULL_EXPORT = 'climbing_data.json'
+DELTA_DIR = 'data'
+MANIFEST = 'manifest.json'
+THUMBNAIL_DIR = 'thumbs'
+
+# Number of deltas listed in the manifest. Clients older than that refetch
+# the full dataset.
+KEEP_DELTAS = 20
+
+def load_records(conn):
+    """Areas and routes (with photos) keyed by their stable Mountain Project IDs"""
+    # The queries stream rows unordered, sort so exports are stable
+    areas = sorted(fetch_records(conn.execute(AREAS_SQL)), key=lambda area: area['id'])
+    routes = sorted(iter_routes(conn.execute(ROUTES_SQL)), key=lambda route: route['id'])
+    return {
+        'areas': {area['id']: area for area in areas},
+        'routes': {route['id']: route for route in routes}
+    }
+
+def diff_records(old, new):
+    """Rows added, updated and removed going from old to new"""
+    return {
+        'added': [new[key] for key in new if key not in old],
+        'updated': [new[key] for key in new if key in old and new[key] != old[key]],
+        'removed': [key for key in old if key not in new]
+    }
+
+def write_json(path, data, **kwargs):
+    """Write a JSON file atomically so clients never fetch a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, default=str, **kwargs)
+    os.replace(tmp, path)
+
+def export_thumbnails(records, export_dir=EXPORT_DIR, store_dir=PHOTO_STORE_DIR):
+    """Copy the thumbnails the routes use next to the export and point their
+    photos at the copies, since the static site has no API to serve them.
+    Photos without a stored thumbnail get None, so clients use the url."""
+    for route in records['routes'].values():
+        for photo in route['photos']:
+            path = thumbnail_file(photo['content_hash'], store_dir) if photo['content_hash'] else None
+            if path is None:
+                photo['thumbnail'] = None
+                continue
+            static_path = f"{THUMBNAIL_DIR}/{photo['content_hash']}.jpg"
+            dst = os.path.join(export_dir, static_path)
+            # Content-addressed, a copy that exists is already the right file
+            if not os.path.exists(dst):
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                shutil.copyfile(path, dst + '.tmp')
+                os.replace(dst + '.tmp', dst)
+            photo['thumbnail'] = static_path
+    return records
+
+def read_snapshot(version):
+    """Records of a published snapshot, opened read-only"""
+    conn = duckdb.connect(snapshot_path(version), read_only=True)
+    try:
+        return load_records(conn)
+    finally:
+        conn.close()
+
+def export_snapshot(version, previous=None, export_dir=EXPORT_DIR):
+    """Export a published snapshot as the full dataset plus a delta against
+    the snapshot published before it, and update the manifest. Run only
+    after publishing, so the files never describe an unpublished crawl."""
+    records = export_thumbnails(read_snapshot(version), export_dir)
+
+    write_json(os.path.join(export_dir, FULL_EXPORT), {
+        'version': version,
+        'areas': list(records['areas'].values()),
+        'routes': list(records['routes'].values())
+    }, indent=2)
+    print(f"Exported {len(records['areas'])} areas and {len(records['routes'])} routes to {FULL_EXPORT}")
+
+    manifest_path = os.path.join(export_dir, DELTA_DIR, MANIFEST)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = {'deltas': []}
+
+    if previous is not None and os.path.exists(snapshot_path(previous)):
+        prev_records = export_thumbnails(read_snapshot(previous), export_dir)
+
+        delta = {
+            'from': previous,
+            'to': version,
+            'areas': diff_records(prev_records['areas'], records['areas']),
+            'routes': diff_records(prev_records['routes'], records['routes'])
+        }
+        delta_file = f'{DELTA_DIR}/delta-{previous}-{version}.json'
+        write_json(os.path.join(export_dir, delta_file), delta)
+        manifest['deltas'].append({'from': previous, 'to': version, 'path': delta_file})
+
+        changes = sum(len(delta[table][kind]) for table in ('areas', 'routes')
+                      for kind in ('added', 'updated', 'removed'))
+        print(f"Wrote {delta_file} with {changes} changes since {previous}")
+    else:
+        # First export, or the previous snapshot is gone: there is nothing to
+        # diff against, so tell clients on any older version to refetch the
+        # full file rather than letting the chain skip this version
+        manifest['deltas'].append({'from': previous, 'to': version, 'path': None, 'refetch': True})
+        print(f"No snapshot to diff against, clients before {version} refetch {FULL_EXPORT}")
+
+    for old in manifest['deltas'][:-KEEP_DELTAS]:
+        if old['path'] and os.path.exists(os.path.join(export_dir, old['path'])):
+            os.remove(os.path.join(export_dir, old['path']))
+    manifest['deltas'] = manifest['deltas'][-KEEP_DELTAS:]
+
+    manifest['version'] = version
+    manifest['full'] = FULL_EXPORT
+    # Written last so it never points at files that don't exist yet
+    write_json(manifest_path, manifest, indent=2)
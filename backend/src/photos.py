@@ -0,0 +1,166 @@
+import requests
+import asyncio
+import duckdb
+import hashlib
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Content-addressed store: originals/<ab>/<sha256> and thumbs/<ab>/<sha256>.jpg.
+# index.db maps each photo URL already processed to its hash and metadata, so
+# later crawls (which start from an empty database) don't download it again.
+PHOTO_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'photo_store')
+INDEX_NAME = 'index.db'
+THUMBNAIL_SIZE = (320, 320)
+MAX_CONCURRENT_DOWNLOADS = 8
+
+def original_path(content_hash, store_dir=PHOTO_STORE_DIR):
+    return os.path.join(store_dir, 'originals', content_hash[:2], content_hash)
+
+def thumbnail_path(content_hash, store_dir=PHOTO_STORE_DIR):
+    return os.path.join(store_dir, 'thumbs', content_hash[:2], content_hash + '.jpg')
+
+def thumbnail_file(content_hash, store_dir=PHOTO_STORE_DIR):
+    """The stored thumbnail for a hash taken from a request, or None. Only
+    sha256 hex digests are accepted so the hash can't escape the store."""
+    if not re.fullmatch(r'[0-9a-f]{64}', content_hash):
+        return None
+    path = thumbnail_path(content_hash, store_dir)
+    return path if os.path.exists(path) else None
+
+def open_photo_index(store_dir=PHOTO_STORE_DIR):
+    """Open (or create) the url -> content hash index of the store"""
+    os.makedirs(store_dir, exist_ok=True)
+    index = duckdb.connect(os.path.join(store_dir, INDEX_NAME))
+    index.execute('''
+        CREATE TABLE IF NOT EXISTS photo_index (
+            url VARCHAR PRIMARY KEY,
+            content_hash VARCHAR,
+            width INTEGER,
+            height INTEGER,
+            bytes BIGINT
+        )
+    ''')
+    return index
+
+def make_thumbnail(data, dst, size=THUMBNAIL_SIZE):
+    """Validate image bytes and write a JPEG thumbnail for them.
+    Runs in a worker process. Returns the original (width, height) and
+    raises if the bytes are not a readable image."""
+    with Image.open(io.BytesIO(data)) as img:
+        img.verify()
+
+    # verify() leaves the image unusable, so reopen to actually decode it
+    with Image.open(io.BytesIO(data)) as img:
+        width, height = img.size
+        if not os.path.exists(dst):
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            img.thumbnail(size)
+            tmp = f'{dst}.{os.getpid()}.tmp'
+            img.convert('RGB').save(tmp, 'JPEG', quality=80, optimize=True)
+            os.replace(tmp, dst)
+    return width, height
+
+def store_photo(data, content_hash, store_dir=PHOTO_STORE_DIR):
+    """Write validated photo bytes to the store once, keyed by their hash"""
+    path = original_path(content_hash, store_dir)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return path
+
+async def process_photo(url, semaphore, pool, store_dir):
+    """Download, validate, thumbnail and store a single photo URL"""
+    async with semaphore:
+        response = await asyncio.to_thread(requests.get, url, timeout=30)
+    response.raise_for_status()
+    if not response.headers.get('Content-Type', 'image/').startswith('image/'):
+        raise ValueError(f"not an image ({response.headers.get('Content-Type')})")
+
+    data = response.content
+    content_hash = hashlib.sha256(data).hexdigest()
+    loop = asyncio.get_running_loop()
+    # Only bytes that decode as an image make it into the store
+    width, height = await loop.run_in_executor(
+        pool, make_thumbnail, data, thumbnail_path(content_hash, store_dir))
+    store_photo(data, content_hash, store_dir)
+
+    return {
+        'content_hash': content_hash,
+        'width': width,
+        'height': height,
+        'bytes': len(data)
+    }
+
+async def process_photo_urls(urls, store_dir=PHOTO_STORE_DIR):
+    """Run the photo pipeline over a set of URLs. Returns {url: metadata}."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+    results = {}
+
+    with ProcessPoolExecutor() as pool:
+        tasks = {url: asyncio.create_task(process_photo(url, semaphore, pool, store_dir))
+                 for url in urls}
+        for url, task in tasks.items():
+            try:
+                results[url] = await task
+            except Exception as e:
+                print(f"  Error processing photo {url}: {str(e)}")
+
+    return results
+
+def process_route_photos(conn, store_dir=PHOTO_STORE_DIR):
+    """Record hash, dimensions and size on every route_photos row, downloading
+    only the URLs the store hasn't seen before"""
+    if Image is None:
+        print("Pillow is not installed, skipping photo processing")
+        return 0
+
+    urls = [row[0] for row in conn.execute('''
+        SELECT DISTINCT url FROM route_photos
+        WHERE content_hash IS NULL AND url IS NOT NULL
+    ''').fetchall()]
+    if not urls:
+        return 0
+
+    index = open_photo_index(store_dir)
+    try:
+        known = {}
+        for url in urls:
+            row = index.execute('''
+                SELECT content_hash, width, height, bytes FROM photo_index WHERE url = ?
+            ''', [url]).fetchone()
+            if row and os.path.exists(thumbnail_path(row[0], store_dir)):
+                known[url] = {'content_hash': row[0], 'width': row[1], 'height': row[2], 'bytes': row[3]}
+
+        new_urls = [url for url in urls if url not in known]
+        print(f"Processing {len(new_urls)} new photos ({len(known)} already stored)...")
+        results = asyncio.run(process_photo_urls(new_urls, store_dir)) if new_urls else {}
+
+        for url, info in results.items():
+            index.execute('''
+                INSERT OR REPLACE INTO photo_index (url, content_hash, width, height, bytes)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [url, info['content_hash'], info['width'], info['height'], info['bytes']])
+    finally:
+        index.close()
+
+    results.update(known)
+    for url, info in results.items():
+        conn.execute('''
+            UPDATE route_photos
+            SET content_hash = ?, width = ?, height = ?, bytes = ?
+            WHERE url = ?
+        ''', [info['content_hash'], info['width'], info['height'], info['bytes'], url])
+
+    unique = len(set(info['content_hash'] for info in results.values()))
+    print(f"Stored {unique} unique images for {len(results)} photo URLs")
+    return len(results)
@@ -0,0 +1,178 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# SQL behind the API endpoints, shared by the Flask and ASGI servers
+
+# All areas with the number of routes directly in them. Counting per area_id
+# before the join keeps the wide area rows out of the GROUP BY. The full-table
+# queries have no ORDER BY, so rows stream out as the area or route scan
+# produces them instead of after a sort of the whole table.
+AREAS_SQL = '''
+    SELECT
+        a.*,
+        COALESCE(c.route_count, 0) AS route_count
+    FROM climbing_areas a
+    LEFT JOIN (
+        SELECT area_id, COUNT(*) AS route_count
+        FROM routes
+        GROUP BY area_id
+    ) c ON c.area_id = a.id
+'''
+
+# A route's photos, aggregated from route_photos. The list is built unordered
+# (an ordered aggregate has to buffer and sort every photo before any row is
+# returned) and sorted per route with list_sort, by url since it comes first.
+# route_photos.id isn't emitted: it is a per-crawl counter, so it would make
+# every route after a new photo look changed in the deltas. The content hash
+# is the stable key for a stored image.
+PHOTOS_AGG = '''
+    list({
+        'url': url,
+        'caption': caption,
+        'content_hash': content_hash,
+        'thumbnail': CASE WHEN content_hash IS NOT NULL
+            THEN '/api/photos/' || content_hash || '/thumbnail' END,
+        'width': width,
+        'height': height,
+        'bytes': bytes
+    })
+'''
+
+def route_photos_sql(route_ids):
+    """Photos per route for the route ids a subquery selects. The ids are
+    pushed into the route_photos scan, as an IN filter answered from the
+    route_id index (see configure_connection) or, when they are contiguous,
+    a range that skips other row groups."""
+    return f'''
+        SELECT route_id, list_sort({PHOTOS_AGG}) AS photos
+        FROM route_photos
+        WHERE route_id IN ({route_ids})
+        GROUP BY route_id
+    '''
+
+# All routes. Their photos are looked up one batch of routes at a time by
+# iter_routes, so rows go out as the scan produces them and nothing is built
+# over the whole photos table first.
+ROUTES_SQL = 'SELECT * FROM routes'
+
+# Photos of one batch of routes, keyed by route_id. The ids are passed as a
+# '[1,2,...]' string and cast in SQL, binding a Python list of a thousand ints
+# as a parameter takes longer than running the query.
+ROUTE_BATCH_PHOTOS_SQL = route_photos_sql('SELECT unnest($route_ids::BIGINT[])')
+
+def routes_with_photos(filtered_routes):
+    """Wrap a query selecting some routes so each row gets its photos. Only
+    the selected routes' photos are read and aggregated."""
+    return f'''
+    WITH r AS (
+        {filtered_routes}
+    ),
+    p AS ({route_photos_sql('SELECT id FROM r')})
+    SELECT
+        r.*,
+        COALESCE(p.photos, []) AS photos
+    FROM r
+    LEFT JOIN p ON p.route_id = r.id
+    ORDER BY r.id
+'''
+
+AREA_EXISTS_SQL = 'SELECT 1 FROM climbing_areas WHERE id = $area_id'
+
+# An area and everything below it, at any depth, via the closure table
+AREA_SUBTREE_SQL = '''
+    SELECT
+        a.*,
+        c.depth
+    FROM area_closure c
+    JOIN climbing_areas a ON a.id = c.descendant_id
+    WHERE c.ancestor_id = $area_id
+    ORDER BY c.depth, a.id
+'''
+
+# Routes directly in an area
+AREA_ROUTES_SQL = routes_with_photos('''
+        SELECT * FROM routes WHERE area_id = $area_id
+''')
+
+# Routes in an area or any of its sub-areas
+AREA_ROUTES_RECURSIVE_SQL = routes_with_photos('''
+        SELECT routes.*
+        FROM area_closure c
+        JOIN routes ON routes.area_id = c.descendant_id
+        WHERE c.ancestor_id = $area_id
+''')
+
+# DuckDB only turns a join's keys into an IN filter on the other side's scan
+# for up to 50 keys, beyond that it reads every row group in the id range.
+# Allow as many keys as an index scan will take (index_scan_max_count).
+JOIN_FILTER_KEYS = 2048
+
+def configure_connection(conn):
+    """Apply the settings the API queries are planned for. Global, so cursors
+    opened on the connection get them too. DuckDB releases without the
+    setting still run the queries, just with range filters only."""
+    available = conn.execute('''
+        SELECT 1 FROM duckdb_settings() WHERE name = 'dynamic_or_filter_threshold'
+    ''').fetchone()
+    if available is not None:
+        conn.execute(f'SET GLOBAL dynamic_or_filter_threshold = {JOIN_FILTER_KEYS}')
+    return conn
+
+# Every query the API runs, checked for plan regressions by bench_queries.py
+API_QUERIES = {
+    'areas': AREAS_SQL,
+    'routes': ROUTES_SQL,
+    'route_batch_photos': ROUTE_BATCH_PHOTOS_SQL,
+    'area_subtree': AREA_SUBTREE_SQL,
+    'area_routes': AREA_ROUTES_SQL,
+    'area_routes_recursive': AREA_ROUTES_RECURSIVE_SQL
+}
+
+# Rows pulled from DuckDB per batch when streaming
+BATCH_SIZE = 1000
+
+def iter_records(cursor, batch_size=BATCH_SIZE):
+    """Yield rows of an executed query as dicts, one batch at a time"""
+    columns = [col[0] for col in cursor.description]
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            yield dict(zip(columns, row))
+
+def iter_routes(cursor, batch_size=BATCH_SIZE):
+    """Yield routes of an executed ROUTES_SQL as dicts with their photos,
+    fetching each batch's photos on a second cursor so memory stays at one
+    batch however many routes there are"""
+    columns = [col[0] for col in cursor.description]
+    id_index = columns.index('id')
+    photos_cursor = cursor.cursor()
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        route_ids = '[' + ','.join(str(row[id_index]) for row in rows) + ']'
+        photos = dict(photos_cursor.execute(ROUTE_BATCH_PHOTOS_SQL, {'route_ids': route_ids}).fetchall())
+        for row in rows:
+            record = dict(zip(columns, row))
+            record['photos'] = photos.get(record['id'], [])
+            yield record
+
+def fetch_records(cursor):
+    """All rows of an executed query as dicts"""
+    return list(iter_records(cursor))
+
+def is_recursive(args):
+    """Whether a request's query string asks for ?recursive=1"""
+    return args.get('recursive', '').lower() in ('1', 'true', 'yes')
+
+def encode_json(obj):
+    """Serialize to JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, default=str).encode('utf-8')
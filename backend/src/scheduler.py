@@ -0,0 +1,189 @@
+import requests
+import duckdb
+import hashlib
+import os
+import re
+import time
+import zlib
+
+# Crawl state lives in its own file so it survives the fresh climbing
+# database that every run starts from. Anchored to this directory like the
+# snapshots and photo store, so every way of starting the crawl shares it.
+STATE_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crawl_state.db')
+
+# Maximum number of refetches of already-known pages per run. Pages seen for
+# the first time are always fetched since there is nothing cached for them.
+REQUEST_BUDGET = 500
+
+# Recrawl interval bounds in seconds
+DEFAULT_INTERVAL = 7 * 24 * 3600
+MIN_INTERVAL = 24 * 3600
+MAX_INTERVAL = 90 * 24 * 3600
+
+# Area pages are where new routes show up, so they outrank route pages
+KIND_WEIGHTS = {
+    'area': 4.0,
+    'route': 1.0
+}
+
+# Pages that changed within this window get their score multiplied by
+# RECENT_CHANGE_BOOST, since recent edits tend to come in bursts
+RECENT_CHANGE_WINDOW = 30 * 24 * 3600
+RECENT_CHANGE_BOOST = 2.0
+
+# Pages the crawl hasn't reached in this many runs (removed from the site or
+# no longer linked) are dropped, so they stop taking refresh slots
+STALE_RUNS = 3
+
+state_conn = None
+planned_urls = set()
+requests_made = 0
+current_run = 0
+
+def init_crawl_state(db_path=STATE_DB_PATH):
+    """Open (or create) the persistent crawl state database"""
+    global state_conn
+    state_conn = duckdb.connect(db_path)
+    state_conn.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_state (
+            url VARCHAR PRIMARY KEY,
+            kind VARCHAR,
+            depth INTEGER,
+            last_fetched DOUBLE,
+            last_changed DOUBLE,
+            recrawl_interval DOUBLE,
+            content_hash VARCHAR,
+            body BLOB,
+            last_visited_run INTEGER DEFAULT 0,
+            failures INTEGER DEFAULT 0
+        )
+    ''')
+    # Columns added later, for state files created before them
+    state_conn.execute('ALTER TABLE crawl_state ADD COLUMN IF NOT EXISTS last_visited_run INTEGER DEFAULT 0')
+    state_conn.execute('ALTER TABLE crawl_state ADD COLUMN IF NOT EXISTS failures INTEGER DEFAULT 0')
+    state_conn.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_runs (
+            run INTEGER PRIMARY KEY,
+            started_at DOUBLE
+        )
+    ''')
+    return state_conn
+
+def page_fingerprint(html):
+    """Hash the page with scripts and whitespace stripped so ads and tracking
+    snippets don't make every fetch look like a change"""
+    text = re.sub(r'<script.*?</script>', '', html, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def page_priority(kind, depth, last_fetched, last_changed, recrawl_interval, now):
+    """Score how likely a page is to have changed and how much we care.
+    The score is how overdue the page is (1.0 = exactly due) times its kind
+    weight, divided by 1 + depth so shallow areas rank first, and boosted if
+    the page changed recently."""
+    overdue = (now - last_fetched) / recrawl_interval
+    score = overdue * KIND_WEIGHTS.get(kind, 1.0) / (1 + depth)
+    if last_changed is not None and now - last_changed < RECENT_CHANGE_WINDOW:
+        score *= RECENT_CHANGE_BOOST
+    return score
+
+def plan_refresh(budget=REQUEST_BUDGET):
+    """Start a run and pick the known pages it should refetch, highest
+    priority first. Pages the last STALE_RUNS runs never reached are dropped
+    first, or their ever-growing overdue score would win a slot every run."""
+    global planned_urls, requests_made, current_run
+    now = time.time()
+    current_run = state_conn.execute('SELECT COALESCE(MAX(run), 0) + 1 FROM crawl_runs').fetchone()[0]
+    state_conn.execute('INSERT INTO crawl_runs (run, started_at) VALUES (?, ?)', [current_run, now])
+    expired = state_conn.execute('''
+        DELETE FROM crawl_state WHERE last_visited_run < ?
+    ''', [current_run - STALE_RUNS]).fetchone()[0]
+
+    rows = state_conn.execute('''
+        SELECT url, kind, depth, last_fetched, last_changed, recrawl_interval
+        FROM crawl_state
+        WHERE ? - last_fetched >= recrawl_interval
+    ''', [now]).fetchall()
+
+    ranked = sorted(rows, key=lambda row: page_priority(row[1], row[2], row[3], row[4], row[5], now),
+                    reverse=True)
+    planned_urls = set(row[0] for row in ranked[:budget])
+    requests_made = 0
+
+    print(f"Scheduled {len(planned_urls)} of {len(rows)} due pages for refresh, "
+          f"dropped {expired} not reached in {STALE_RUNS} runs")
+    return planned_urls
+
+def record_fetch(url, kind, depth, html):
+    """Store a fetched page and adapt its recrawl interval.
+    Returns True if the page changed since the last fetch."""
+    now = time.time()
+    content_hash = page_fingerprint(html)
+    body = zlib.compress(html.encode('utf-8'))
+
+    row = state_conn.execute('''
+        SELECT content_hash, recrawl_interval, last_changed
+        FROM crawl_state WHERE url = ?
+    ''', [url]).fetchone()
+
+    if row is None:
+        changed = True
+        interval = DEFAULT_INTERVAL
+        last_changed = now
+    else:
+        changed = row[0] != content_hash
+        if changed:
+            # Pages that change get checked twice as often
+            interval = max(MIN_INTERVAL, row[1] / 2)
+            last_changed = now
+        else:
+            interval = min(MAX_INTERVAL, row[1] * 1.5)
+            last_changed = row[2]
+
+    state_conn.execute('''
+        INSERT OR REPLACE INTO crawl_state (
+            url, kind, depth, last_fetched, last_changed,
+            recrawl_interval, content_hash, body, last_visited_run, failures
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+    ''', [url, kind, depth, now, last_changed, interval, content_hash, body, current_run])
+
+    return changed
+
+def record_failure(url):
+    """Count a failed refetch as an attempt, so a page that keeps failing
+    waits out its interval again instead of ranking first every run"""
+    state_conn.execute('''
+        UPDATE crawl_state
+        SET last_fetched = ?, failures = failures + 1
+        WHERE url = ?
+    ''', [time.time(), url])
+
+def fetch_page(url, kind, depth=0):
+    """Return the HTML for a page, fetching it only if it is new or was
+    scheduled for refresh this run. Otherwise the cached copy is used."""
+    global requests_made
+
+    # Mark the page as still reachable, whether or not it is refetched
+    row = state_conn.execute('''
+        UPDATE crawl_state SET last_visited_run = ? WHERE url = ?
+        RETURNING body
+    ''', [current_run, url]).fetchone()
+    if row is not None and url not in planned_urls:
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    requests_made += 1
+    planned_urls.discard(url)  # Later visits this run reuse the fresh copy
+    try:
+        response = requests.get(url)
+        response.raise_for_status()
+    except Exception:
+        record_failure(url)
+        raise
+
+    changed = record_fetch(url, kind, depth, response.text)
+    if not changed:
+        print("  " * depth + f"  Unchanged since last crawl: {url}")
+
+    # Be nice to the server, but only when we actually hit it
+    time.sleep(0.5)
+    return response.text
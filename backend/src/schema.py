@@ -0,0 +1,185 @@
+import re
+
+# Schema migrations, applied in order. Each entry is (version, description,
+# statements); a database records the versions it has applied in
+# schema_version, so migrate() only ever runs what is new. Never edit a
+# migration that has shipped, add a new one instead.
+MIGRATIONS = [
+    (1, 'typed tables', [
+        '''
+        CREATE TYPE route_type AS ENUM (
+            'trad', 'sport', 'tr', 'aid', 'mixed', 'ice', 'alpine', 'snow', 'boulder', 'other'
+        )
+        ''',
+        '''
+        CREATE TABLE climbing_areas (
+            id BIGINT PRIMARY KEY,
+            name VARCHAR NOT NULL,
+            url VARCHAR,
+            description VARCHAR,
+            location VARCHAR,
+            latitude DOUBLE,
+            longitude DOUBLE,
+            type VARCHAR,
+            elevation DOUBLE,        -- feet
+            season VARCHAR,
+            approach_time VARCHAR,
+            parent_area_id BIGINT
+        )
+        ''',
+        '''
+        CREATE TABLE routes (
+            id BIGINT PRIMARY KEY,
+            area_id BIGINT NOT NULL,
+            name VARCHAR NOT NULL,
+            grade VARCHAR,
+            type route_type,
+            height DOUBLE,           -- feet
+            pitches INTEGER,
+            first_ascent VARCHAR,
+            description VARCHAR,
+            protection VARCHAR,
+            latitude DOUBLE,
+            longitude DOUBLE,
+            location_description VARCHAR,
+            url VARCHAR,
+            FOREIGN KEY (area_id) REFERENCES climbing_areas(id)
+        )
+        ''',
+        '''
+        CREATE TABLE route_photos (
+            id INTEGER PRIMARY KEY,
+            route_id BIGINT NOT NULL,
+            url VARCHAR,
+            caption VARCHAR,
+            content_hash VARCHAR,
+            width INTEGER,
+            height INTEGER,
+            bytes BIGINT,
+            FOREIGN KEY (route_id) REFERENCES routes(id)
+        )
+        '''
+    ]),
+    (2, 'indexes for join and filter paths', [
+        'CREATE INDEX idx_routes_area_id ON routes(area_id)',
+        'CREATE INDEX idx_route_photos_route_id ON route_photos(route_id)',
+        'CREATE INDEX idx_route_photos_url ON route_photos(url)',
+        'CREATE INDEX idx_climbing_areas_parent_area_id ON climbing_areas(parent_area_id)'
+    ]),
+    (3, 'area closure table', [
+        '''
+        CREATE TABLE area_closure (
+            ancestor_id BIGINT NOT NULL,
+            descendant_id BIGINT NOT NULL,
+            depth INTEGER NOT NULL      -- 0 for the area itself
+        )
+        ''',
+        # Backfill from the parent links of any areas already present
+        '''
+        INSERT INTO area_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE tree(ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM climbing_areas
+            UNION ALL
+            SELECT t.ancestor_id, a.id, t.depth + 1
+            FROM tree t
+            JOIN climbing_areas a ON a.parent_area_id = t.descendant_id
+        )
+        SELECT ancestor_id, descendant_id, depth FROM tree
+        ''',
+        'CREATE INDEX idx_area_closure_ancestor_id ON area_closure(ancestor_id)',
+        'CREATE INDEX idx_area_closure_descendant_id ON area_closure(descendant_id)'
+    ]),
+]
+
+# Values of the route_type enum and the words Mountain Project uses for them
+ROUTE_TYPES = {
+    'trad': 'trad',
+    'sport': 'sport',
+    'tr': 'tr',
+    'top rope': 'tr',
+    'aid': 'aid',
+    'mixed': 'mixed',
+    'ice': 'ice',
+    'alpine': 'alpine',
+    'snow': 'snow',
+    'boulder': 'boulder'
+}
+
+def schema_version(conn):
+    """Highest migration applied to a database, 0 for a new one"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description VARCHAR,
+            applied_at TIMESTAMP DEFAULT current_timestamp
+        )
+    ''')
+    return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+def migrate(conn):
+    """Bring a database up to the latest schema, one transaction per migration"""
+    current = schema_version(conn)
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        conn.execute('BEGIN TRANSACTION')
+        try:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                         [version, description])
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        print(f"Applied schema migration {version}: {description}")
+    return conn
+
+def add_area_to_closure(conn, area_id, parent_id):
+    """Record an area in area_closure: itself at depth 0 plus every ancestor
+    of its parent one level further down. The parent must already be in it."""
+    conn.execute('''
+        INSERT INTO area_closure (ancestor_id, descendant_id, depth)
+        VALUES (?, ?, 0)
+    ''', [area_id, area_id])
+    if parent_id is not None:
+        conn.execute('''
+            INSERT INTO area_closure (ancestor_id, descendant_id, depth)
+            SELECT ancestor_id, ?, depth + 1
+            FROM area_closure
+            WHERE descendant_id = ?
+        ''', [area_id, parent_id])
+
+def parse_feet(text):
+    """Turn a Mountain Project length like '80 ft (24 m)' or '1,200 ft' into
+    feet. Bare numbers are taken as feet, metres are converted. Returns None
+    when the text has no number in it."""
+    if text is None or text == '':
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    match = re.search(r'(\d[\d,]*(?:\.\d+)?)\s*(ft|feet|\'|m\b|meters|metres)?', text, re.IGNORECASE)
+    if not match:
+        return None
+    value = float(match.group(1).replace(',', ''))
+    unit = (match.group(2) or 'ft').lower()
+    if unit.startswith('m'):
+        value = round(value * 3.28084, 1)
+    return value
+
+def parse_route_type(text):
+    """Map a type like 'Trad, Sport, TR' to its primary route_type value"""
+    if not text:
+        return None
+    for part in re.split(r'[,/]', text.lower()):
+        part = part.strip()
+        for word, route_type in ROUTE_TYPES.items():
+            if part.startswith(word):
+                return route_type
+    return 'other'
+
+def parse_pitches(value):
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
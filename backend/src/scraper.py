@@ -1,69 +1,30 @@
-import requests
 from bs4 import BeautifulSoup
-import json
 import duckdb
 import re
-import time
 import os
+import queue
+import threading
+import scheduler
+from scheduler import init_crawl_state, plan_refresh, fetch_page
+from photos import process_route_photos
+from snapshots import new_staging_snapshot, publish_snapshot, discard_snapshot, current_version
+from export import export_snapshot
+from schema import migrate, add_area_to_closure, parse_feet, parse_route_type, parse_pitches
 
-def init_database():
-    """Initialize the database with fresh tables"""
-    # Start with a clean database file
-    db_path = 'climbing.db'
-    if os.path.exists(db_path):
-        os.remove(db_path)
-    conn = duckdb.connect(db_path)
-    
-    # Create tables
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS climbing_areas (
-            id INTEGER PRIMARY KEY,
-            name VARCHAR,
-            description TEXT,
-            location VARCHAR,
-            latitude DOUBLE,
-            longitude DOUBLE,
-            parent_id INTEGER,
-            url VARCHAR
-        )
-    ''')
+# Set FETCH_PHOTOS=1 to download, dedupe and thumbnail route photos after the crawl
+FETCH_PHOTOS = os.environ.get('FETCH_PHOTOS') == '1'
 
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS routes (
-            id INTEGER PRIMARY KEY,
-            name VARCHAR,
-            grade VARCHAR,
-            type VARCHAR,
-            description TEXT,
-            protection VARCHAR,
-            location VARCHAR,
-            latitude DOUBLE,
-            longitude DOUBLE,
-            area_id INTEGER,
-            url VARCHAR,
-            FOREIGN KEY (area_id) REFERENCES climbing_areas(id)
-        )
-    ''')
-
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS route_photos (
-            id INTEGER PRIMARY KEY,
-            route_id INTEGER,
-            url VARCHAR,
-            caption VARCHAR,
-            FOREIGN KEY (route_id) REFERENCES routes(id)
-        )
-    ''')
-    
+def init_database(db_path):
+    """Initialize a fresh staging database with the current schema"""
+    conn = duckdb.connect(db_path)
+    migrate(conn)
     return conn
 
-# Initialize database
-conn = init_database()
+# Database for the crawl in progress, a staging snapshot opened in __main__
+conn = None
 
-# Global counters for IDs
-area_id = 1
-route_id = 1
-photo_id = 1
+# Maximum number of parsed records waiting to be written
+WRITE_QUEUE_SIZE = 100
 
 def get_area_info(soup):
     """Extract area information from the soup object"""
@@ -150,9 +111,11 @@ def get_area_info(soup):
                     approach_time = value_text
     
     return {
-        'description': description_text,
-        'latitude': lat,
-        'longitude': lng,
+        'name': info['name'],
+        'description': info['description'],
+        'location': info['location'],
+        'latitude': info['latitude'],
+        'longitude': info['longitude'],
         'type': area_type,
         'elevation': elevation,
         'season': season,
@@ -267,8 +230,8 @@ def get_route_info(soup, url=''):
     if name_elem:
         route_info['name'] = name_elem.text.strip()
         # Remove any edit links text
-        if 'Suggest Change' in name:
-            name = name.split('Suggest Change')[0].strip()
+        if 'Suggest Change' in route_info['name']:
+            route_info['name'] = route_info['name'].split('Suggest Change')[0].strip()
     
     # Get route grade
     grade_div = soup.find('div', class_='mr-2')
@@ -322,453 +285,242 @@ def get_route_info(soup, url=''):
             route_type = 'Sport'
     
     return {
-        'name': name,
+        'name': route_info['name'],
         'grade': grade,
         'type': route_type,
         'height': height,
         'pitches': pitches,
         'first_ascent': first_ascent,
         'description': description,
-        'protection': protection
+        'protection': protection,
+        'url': url,
+        'latitude': route_info['latitude'],
+        'longitude': route_info['longitude'],
+        'photos': route_info['photos'],
+        'location_description': route_info['location_description']
     }
 
-def scrape_mountain_project():
-    """Main function to scrape Mountain Project"""
-    global area_id, route_id, photo_id
-    
-    base_urls = [
-        'https://www.mountainproject.com/area/105856477/marquette',
-        'https://www.mountainproject.com/area/105856478/munising',
-        'https://www.mountainproject.com/area/105856479/ishpeming'
-    ]
-    
-    for url in base_urls:
-        print(f"Processing {url}...")
-        scrape_area(url)
+# Known coordinates for key areas
+AREA_COORDS = {
+    'Copper Country': (47.1164, -88.5463),
+    'Horse Race Rapids': (46.4047, -87.6261),
+    'Iron Mountain': (45.8203, -88.0657),
+    'Laughing Whitefish Falls': (46.3894, -87.0639),
+    'Little Huron River Range': (46.8539, -87.8514),
+    'Little Norwich': (46.5481, -87.4106),
+    'Mackinac Island': (45.8489, -84.6189),
+    'Maple Hill': (46.5481, -87.4106),
+    'Marquette (and Central UP) Bouldering': (46.5436, -87.3954),
+    'Marquette (and Central UP) Roped': (46.5436, -87.3954),
+    'Michigamme': (46.5333, -88.1000),
+    'Montreal River': (46.9264, -90.3878),
+    'Munising': (46.4111, -86.6489),
+    'Narnia Trail Boulders': (46.5436, -87.3954),
+    'Norwich Cemetery Bluff': (46.5481, -87.4106),
+    'Norwich Ledge': (46.5481, -87.4106),
+    'Old 41 boulders': (47.1164, -88.5463),
+    'Rock River Wilderness (Eben Ice Caves)': (46.3500, -87.2167),
+    'Silver Mountain': (46.7333, -87.9000),
+    'Sturgeon River Gorge (Canyon Falls)': (46.7167, -88.4833)
+}
+
+def mountain_project_id(url):
+    """The numeric Mountain Project ID in an area or route URL, used as our
+    primary key so IDs stay stable from one crawl to the next"""
+    match = re.search(r'/(?:area|route)/(\d+)', url or '')
+    return int(match.group(1)) if match else None
+
+def crawl_area(url, name, seen, parent_id=None, depth=1, max_depth=2):
+    """Fetch and parse an area, its routes and its sub-areas, yielding
+    ('area', info) and ('route', info) records as soon as each page is parsed.
+    Only the current page's soup is alive at any time."""
+    current_area_id = mountain_project_id(url)
+    if current_area_id is None or current_area_id in seen:
+        return
+    seen.add(current_area_id)
+    
+    page = fetch_page(url, 'area', depth)
+    soup = BeautifulSoup(page, 'html.parser')
+    del page
+    
+    area_info = get_area_info(soup)
+    
+    # Pull out the links we still need, then free the tree before descending
+    route_urls = []
+    route_table = soup.find('table', {'id': 'left-nav-route-table'})
+    if route_table:
+        for row in route_table.find_all('tr')[1:]:  # Skip header row
+            route_link = row.find('a')
+            if route_link:
+                route_urls.append(route_link['href'])
     
-    # Export the data to JSON for backup
-    conn.execute("EXPORT DATABASE 'climbing.db'")
+    sub_areas = []
+    if depth < max_depth:
+        area_table = soup.find('table', {'id': 'left-nav-area-table'})
+        if area_table:
+            sub_areas = [(link.text.strip(), link['href']) for link in area_table.find_all('a')]
+    soup.decompose()
     
-    print(f"\nScraping complete!")
-    print(f"Processed {area_id-1} areas with {route_id-1} routes successfully")
-    print("Data stored in climbing.db and exported to climbing_data.json")
-
-def scrape_area(url, parent_id=None, depth=0, max_depth=2):
-    """Scrape an area and its sub-areas, including individual route pages"""
-    global area_id, route_id, photo_id
+    # Get coordinates from hardcoded values or area_info
+    if name in AREA_COORDS:
+        area_info['latitude'], area_info['longitude'] = AREA_COORDS[name]
     
-    if depth > max_depth:
-        return None
+    area_info.update({
+        'id': current_area_id,
+        'name': name,
+        'url': url,
+        'parent_area_id': parent_id
+    })
+    yield 'area', area_info
     
-    print("  " * depth + f"Fetching {url}...")
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Get area info
-        area_info = get_area_info(soup)
-        if not area_info['name']:
-            print("  " * depth + "  Skipping area - no name found")
-            return None
-            
-        print("  " * depth + f"Processing area: {area_info['name']}")
-        
-        # Insert area into database
-        conn.execute('''
-            INSERT INTO climbing_areas (id, name, description, location, latitude, longitude, url)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', [area_id, area_info['name'], area_info['description'], area_info['location'],
-              area_info['latitude'], area_info['longitude'], url])
-        
-        current_area_id = area_id
-        area_id += 1
+    for route_url in route_urls:
+        print("  " * depth + f"  Fetching route {route_url}...")
+        try:
+            route_page = fetch_page(route_url, 'route', depth + 1)
+            route_soup = BeautifulSoup(route_page, 'html.parser')
+            del route_page
+            route_info = get_route_info(route_soup, route_url)
+            route_soup.decompose()
+        except Exception as e:
+            print("  " * depth + f"  Error processing route {route_url}: {str(e)}")
+            continue
         
-        # Get routes
-        route_links = soup.find_all('a', class_='route-row')
-        for link in route_links:
-            route_url = 'https://www.mountainproject.com' + link['href']
-            print("  " * (depth + 1) + f"Fetching route {route_url}...")
-            
-            try:
-                route_response = requests.get(route_url)
-                route_response.raise_for_status()
-                route_soup = BeautifulSoup(route_response.text, 'html.parser')
-                route_info = get_route_info(route_soup, route_url)
+        if route_info and route_info['name'] and mountain_project_id(route_url):
+            route_info['id'] = mountain_project_id(route_url)
+            route_info['area_id'] = current_area_id
+            yield 'route', route_info
+    
+    for sub_name, sub_url in sub_areas:
+        print("  " * depth + f"  Fetching sub-area {sub_url}...")
+        try:
+            yield from crawl_area(sub_url, sub_name, seen, current_area_id, depth + 1, max_depth)
+        except Exception as e:
+            print("  " * depth + f"  Error processing sub-area {sub_url}: {str(e)}")
+
+def write_records(record_queue, stats):
+    """Drain crawl records from the queue into the database until a None arrives"""
+    photo_id = 1
+    failed_area_ids = set()
+    while True:
+        record = record_queue.get()
+        if record is None:
+            break
+        kind, info = record
+        # Routes can't be stored without their area, skip them quietly
+        if kind == 'route' and info['area_id'] in failed_area_ids:
+            stats['failed_routes'] += 1
+            continue
+        try:
+            if kind == 'area':
+                conn.execute('''
+                    INSERT INTO climbing_areas (
+                        id, name, url, description, latitude, longitude,
+                        type, elevation, season, approach_time, parent_area_id
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [info['id'], info['name'], info['url'], info['description'],
+                      info['latitude'], info['longitude'], info['type'],
+                      parse_feet(info['elevation']), info['season'], info['approach_time'],
+                      info['parent_area_id']])
+                add_area_to_closure(conn, info['id'], info['parent_area_id'])
+                stats['areas'] += 1
+            else:
+                conn.execute('''
+                    INSERT INTO routes (
+                        id, area_id, name, grade, type, height,
+                        pitches, first_ascent, description, protection,
+                        latitude, longitude, location_description, url
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [info['id'], info['area_id'], info['name'], info['grade'],
+                      parse_route_type(info['type']), parse_feet(info['height']),
+                      parse_pitches(info['pitches']),
+                      info['first_ascent'], info['description'],
+                      info['protection'], info['latitude'], info['longitude'],
+                      info['location_description'], info['url']])
                 
-                if route_info and route_info['name']:
-                    # Insert route into database
+                for photo in info['photos']:
                     conn.execute('''
-                        INSERT INTO routes (id, name, grade, type, description, protection,
-                                          location, latitude, longitude, area_id, url)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', [route_id, route_info['name'], route_info['grade'], route_info['type'],
-                          route_info['description'], route_info['protection'], route_info['location'],
-                          route_info['latitude'], route_info['longitude'], current_area_id, route_info['url']])
-                    
-                    # Insert photos
-                    for photo in route_info['photos']:
-                        conn.execute('''
-                            INSERT INTO route_photos (id, route_id, url, caption)
-                            VALUES (?, ?, ?, ?)
-                        ''', [photo_id, route_id, photo['url'], photo['caption']])
-                        photo_id += 1
-                    
-                    route_id += 1
-                    print("  " * (depth + 1) + f"  Added route: {route_info['name']}")
-                
-                time.sleep(1)  # Be nice to the server
-            except Exception as e:
-                print("  " * (depth + 1) + f"Error processing route {route_url}: {str(e)}")
-                continue
-        
-        # Get sub-areas
-        area_table = soup.find('table', {'id': 'left-nav-area-table'})
-        if area_table:
-            area_links = area_table.find_all('a')
-            for link in area_links:
-                sub_area_url = 'https://www.mountainproject.com' + link['href']
-                scrape_area(sub_area_url, current_area_id, depth + 1, max_depth)
-        
-        time.sleep(1)  # Be nice to the server
-        
-    except Exception as e:
-        print(f"Error scraping area {url}: {str(e)}")
-        return None
-    
-    # If no routes found, try getting count from stats
-    if number_of_routes == 0:
-        stats_div = soup.find('div', class_='description')
-        if stats_div:
-            route_count_match = re.search(r'(\d+)\s+Total\s+Routes', stats_div.text)
-            if route_count_match:
-                number_of_routes = int(route_count_match.group(1))
-    
-    # If still no routes, try finding count in sidebar
-    if number_of_routes == 0:
-        left_nav_div = soup.find('div', class_='mp-sidebar')
-        if left_nav_div:
-            route_text = left_nav_div.find(string=re.compile(r'\d+ Routes'))
-            if route_text:
-                number_of_routes = int(re.search(r'\d+', route_text).group())
-    
-    # Get sub-areas
-    sub_areas = []
-    area_table = soup.find('table', id='left-nav-area-table')
-    if area_table:
-        area_links = area_table.find_all('a')
-        for link in area_links:
-            sub_url = link['href']
-            sub_area = scrape_area(sub_url, depth + 1, max_depth)
-            if sub_area:
-                sub_areas.append(sub_area)
-    
-    # Combine route grades from sub-areas
-    for sub_area in sub_areas:
-        route_grades.extend(sub_area.get('grades', []))
-        number_of_routes += sub_area.get('number_of_routes', 0)
-    
-    # Format grade range
-    grade_range = ''
-    if route_grades:
-        def grade_sort_key(grade):
-            grade = grade.strip()
-            if grade.startswith('5.'):
-                try:
-                    return float(grade.replace('5.', ''))
-                except ValueError:
-                    return 0
-            elif grade.startswith('V'):
-                try:
-                    return float(grade.replace('V', '').replace('+', '.3').replace('-', '.7'))
-                except ValueError:
-                    return 0
+                        INSERT INTO route_photos (id, route_id, url, caption)
+                        VALUES (?, ?, ?, ?)
+                    ''', [photo_id, info['id'], photo['url'], photo['caption']])
+                    photo_id += 1
+                    stats['photos'] += 1
+                stats['routes'] += 1
+        except Exception as e:
+            # Keep draining so the crawler never blocks on a dead writer
+            print(f"Error writing {kind} {info.get('url')}: {str(e)}")
+            if kind == 'area':
+                failed_area_ids.add(info['id'])
+                stats['failed_areas'] += 1
             else:
-                try:
-                    return float(grade.replace('+', '.3').replace('-', '.7'))
-                except ValueError:
-                    return 0
-        
-        route_grades = sorted(set(route_grades), key=grade_sort_key)
-        grade_range = f"{route_grades[0]} - {route_grades[-1]}"
-    
-    return {
-        'url': url,
-        'description': description_text,
-        'latitude': lat,
-        'longitude': lng,
-        'grades': route_grades,
-        'grade_range': grade_range,
-        'number_of_routes': number_of_routes
-    }
+                stats['failed_routes'] += 1
 
 def scrape_mountain_project():
     """Main function to scrape Mountain Project"""
-    area_id = 1
-    route_id = 1
-    photo_id = 1
-    base_urls = [
-        'https://www.mountainproject.com/area/105856477/marquette',
-        'https://www.mountainproject.com/area/105856478/munising',
-        'https://www.mountainproject.com/area/105856479/ishpeming'
-    ]
-    
-    # Known coordinates for key areas
-    AREA_COORDS = {
-        'Copper Country': (47.1164, -88.5463),
-        'Horse Race Rapids': (46.4047, -87.6261),
-        'Iron Mountain': (45.8203, -88.0657),
-        'Laughing Whitefish Falls': (46.3894, -87.0639),
-        'Little Huron River Range': (46.8539, -87.8514),
-        'Little Norwich': (46.5481, -87.4106),
-        'Mackinac Island': (45.8489, -84.6189),
-        'Maple Hill': (46.5481, -87.4106),
-        'Marquette (and Central UP) Bouldering': (46.5436, -87.3954),
-        'Marquette (and Central UP) Roped': (46.5436, -87.3954),
-        'Michigamme': (46.5333, -88.1000),
-        'Montreal River': (46.9264, -90.3878),
-        'Munising': (46.4111, -86.6489),
-        'Narnia Trail Boulders': (46.5436, -87.3954),
-        'Norwich Cemetery Bluff': (46.5481, -87.4106),
-        'Norwich Ledge': (46.5481, -87.4106),
-        'Old 41 boulders': (47.1164, -88.5463),
-        'Rock River Wilderness (Eben Ice Caves)': (46.3500, -87.2167),
-        'Silver Mountain': (46.7333, -87.9000),
-        'Sturgeon River Gorge (Canyon Falls)': (46.7167, -88.4833)
-    }
+    # Decide which known pages are worth refetching this run
+    plan_refresh()
     
-    # Get the main page
     print("Fetching main page...")
-    response = requests.get('https://www.mountainproject.com/area/118171033/upper-peninsula')
-    soup = BeautifulSoup(response.text, 'html.parser')
+    main_url = 'https://www.mountainproject.com/area/118171033/upper-peninsula'
+    page = fetch_page(main_url, 'area', 0)
+    soup = BeautifulSoup(page, 'html.parser')
     
     # Find all area links
     area_links = soup.find_all('a', href=re.compile(r'/area/\d+/'))
     area_links = [link for link in area_links if not any(x in link.text.lower() for x in ['add to page', 'improve page'])]
-    area_links = list(set(area_links))  # Remove duplicates
+    area_links = list(dict.fromkeys((link.text.strip(), link['href']) for link in area_links))  # Remove duplicates
+    soup.decompose()
     
     print(f"Found {len(area_links)} areas to process")
-    area_id = 1
-    route_id = 1
-    area_list = []
-    route_list = []
     
-    # Process each area
-    for area_link in area_links:
-        try:
-            area_name = area_link.text.strip()
-            area_url = area_link['href']
-            print(f"Processing {area_name}...")
-            
-            # Get area page
-            response = requests.get(area_url)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Get area information
-            area_info = get_area_info(soup)
-            
-            # Get routes
-            routes = []
-            
-            # Get routes from the route table
-            route_table = soup.find('table', {'id': 'left-nav-route-table'})
-            if route_table:
-                route_rows = route_table.find_all('tr')[1:]  # Skip header row
-                for row in route_rows:
-                    route_link = row.find('a')
-                    if route_link:
-                        route_url = route_link['href']
-                        print(f"  Fetching route {route_url}...")
-                        route_response = requests.get(route_url)
-                        route_soup = BeautifulSoup(route_response.text, 'html.parser')
-                        route_info = get_route_info(route_soup)
-                        if route_info['name']:
-                            routes.append(route_info)
-                        time.sleep(0.5)  # Be nice to the server
-            
-            # Also check for routes in sub-areas
-            area_table = soup.find('table', {'id': 'left-nav-area-table'})
-            if area_table:
-                sub_links = area_table.find_all('a')
-                for sub_link in sub_links:
-                    sub_url = sub_link['href']
-                    print(f"  Fetching sub-area {sub_url}...")
-                    sub_response = requests.get(sub_url)
-                    sub_soup = BeautifulSoup(sub_response.text, 'html.parser')
-                    
-                    # Get routes from sub-area
-                    sub_route_table = sub_soup.find('table', {'id': 'left-nav-route-table'})
-                    if sub_route_table:
-                        sub_route_rows = sub_route_table.find_all('tr')[1:]  # Skip header row
-                        for row in sub_route_rows:
-                            route_link = row.find('a')
-                            if route_link:
-                                route_url = route_link['href']
-                                print(f"    Fetching route {route_url}...")
-                                route_response = requests.get(route_url)
-                                route_soup = BeautifulSoup(route_response.text, 'html.parser')
-                                route_info = get_route_info(route_soup, route_url)
-                                if route_info['name']:
-                                    routes.append(route_info)
-                                time.sleep(0.5)  # Be nice to the server
-            
-            # Get sub-areas
-            sub_areas = []
-            area_table = soup.find('table', id='left-nav-area-table')
-            if area_table:
-                sub_links = area_table.find_all('a')
-                for sub_link in sub_links:
-                    sub_url = sub_link['href']
-                    sub_response = requests.get(sub_url)
-                    sub_soup = BeautifulSoup(sub_response.text, 'html.parser')
-                    
-                    # Get sub-area info
-                    sub_info = get_area_info(sub_soup)
-                    sub_info['name'] = sub_link.text.strip()
-                    sub_info['url'] = sub_url
-                    sub_info['parent_id'] = area_id
-                    sub_areas.append(sub_info)
-                    
-                    # Get routes in sub-area
-                    sub_routes_div = sub_soup.find('div', id='routes-div')
-                    if sub_routes_div:
-                        sub_route_divs = sub_routes_div.find_all('div', class_='route-table')
-                        for route_div in sub_route_divs:
-                            route_info = get_route_info(route_div, route_url)
-                            if route_info['name']:
-                                routes.append(route_info)
-                    
-                    time.sleep(1)  # Be nice to the server
-            
-            # Get coordinates from hardcoded values or area_info
-            lat = lng = None
-            if area_name in AREA_COORDS:
-                lat, lng = AREA_COORDS[area_name]
-            else:
-                lat = area_info['latitude']
-                lng = area_info['longitude']
-            
-            # Store area in database
-            conn.execute('''
-                INSERT INTO climbing_areas (
-                    id, name, url, description, latitude, longitude,
-                    type, elevation, season, approach_time
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', [area_id, area_name, area_url, area_info['description'],
-                  lat, lng, area_info['type'], area_info['elevation'],
-                  area_info['season'], area_info['approach_time']])
-            
-            # Store routes in database
-            for route in routes:
-                conn.execute('''
-                    INSERT INTO routes (
-                        id, area_id, name, grade, type, height,
-                        pitches, first_ascent, description, protection,
-                        latitude, longitude, location_description, url
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', [route_id, area_id, route['name'], route['grade'],
-                      route['type'], route['height'], route['pitches'],
-                      route['first_ascent'], route['description'],
-                      route['protection'], route['latitude'], route['longitude'],
-                      route['location_description'], route['url']])
-                route_id += 1
-            
-            # Store sub-areas in database
-            for sub_area in sub_areas:
-                area_id += 1
-                conn.execute('''
-                    INSERT INTO climbing_areas (
-                        id, name, url, description, latitude, longitude,
-                        type, elevation, season, approach_time, parent_area_id
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', [area_id, sub_area['name'], sub_area['url'],
-                      sub_area['description'], sub_area['latitude'],
-                      sub_area['longitude'], sub_area['type'],
-                      sub_area['elevation'], sub_area['season'],
-                      sub_area['approach_time'], sub_area['parent_id']])
-            
-            area_id += 1
-            print(f"Successfully processed {area_name} with {len(routes)} routes")
-            
-            # Be nice to the server
-            time.sleep(2)
-            
-        except Exception as e:
-            print(f"Error processing area {area_name if 'area_name' in locals() else 'unknown'}: {str(e)}")
-            continue
+    # Records flow fetch/parse -> bounded queue -> writer, so the crawler
+    # blocks instead of buffering when the database falls behind
+    record_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+    stats = {'areas': 0, 'routes': 0, 'photos': 0, 'failed_areas': 0, 'failed_routes': 0}
+    writer = threading.Thread(target=write_records, args=(record_queue, stats))
+    writer.start()
     
-    print(f"Processed {area_id-1} areas with {route_id-1} routes successfully")
-    
-    # Export to JSON
-    conn.execute('SELECT * FROM climbing_areas')
-    areas = [{
-        'id': row[0],
-        'name': row[1],
-        'url': row[2],
-        'description': row[3],
-        'latitude': row[4],
-        'longitude': row[5],
-        'type': row[6],
-        'elevation': row[7],
-        'season': row[8],
-        'approach_time': row[9],
-        'parent_area_id': row[10] if len(row) > 10 else None
-    } for row in conn.fetchall()]
-    
-    conn.execute('SELECT * FROM routes')
-    routes = [{
-        'id': row[0],
-        'area_id': row[1],
-        'name': row[2],
-        'grade': row[3],
-        'type': row[4],
-        'height': row[5],
-        'pitches': row[6],
-        'first_ascent': row[7],
-        'description': row[8],
-        'protection': row[9],
-        'latitude': row[10],
-        'longitude': row[11],
-        'location_description': row[12],
-        'url': row[13]
-    } for row in conn.fetchall()]
-    
-    # Get photos for each route
-    conn.execute('SELECT * FROM route_photos')
-    photos = [{
-        'id': row[0],
-        'route_id': row[1],
-        'url': row[2],
-        'caption': row[3]
-    } for row in conn.fetchall()]
-    
-    # Associate photos with routes
-    route_photos = {}
-    for photo in photos:
-        route_id = photo['route_id']
-        if route_id not in route_photos:
-            route_photos[route_id] = []
-        route_photos[route_id].append({
-            'url': photo['url'],
-            'caption': photo['caption']
-        })
-    
-    # Add photos to routes
-    for route in routes:
-        route['photos'] = route_photos.get(route['id'], [])
-    
-    data = {
-        'areas': areas,
-        'routes': routes
-    }
+    seen = {mountain_project_id(main_url)}  # Don't crawl links back to the main page
+    try:
+        for area_name, area_url in area_links:
+            print(f"Processing {area_name}...")
+            try:
+                for record in crawl_area(area_url, area_name, seen):
+                    record_queue.put(record)
+            except Exception as e:
+                print(f"Error processing area {area_name}: {str(e)}")
+                continue
+    finally:
+        record_queue.put(None)
+        writer.join()
     
-    with open('climbing_data.json', 'w') as f:
-        json.dump(data, f, indent=2)
+    print(f"Processed {stats['areas']} areas with {stats['routes']} routes successfully")
+    if stats['failed_areas'] or stats['failed_routes']:
+        print(f"Failed to store {stats['failed_areas']} areas and {stats['failed_routes']} routes")
+    print(f"Made {scheduler.requests_made} requests, reused cached copies for the rest")
     
-    print("Scraping complete! Data stored in climbing.db and exported to climbing_data.json")
+    # Optionally download photos once each and build thumbnails for them
+    if FETCH_PHOTOS:
+        process_route_photos(conn)
 
 if __name__ == '__main__':
+    # Crawl into a staging snapshot so the API keeps serving the last
+    # published one until this run is complete
+    previous = current_version()
+    version, staging_path = new_staging_snapshot()
+    conn = init_database(staging_path)
+    init_crawl_state()
     try:
         scrape_mountain_project()
-    finally:
+        conn.execute('CHECKPOINT')
         conn.close()
+        publish_snapshot(staging_path, version)
+    except BaseException:
+        conn.close()
+        discard_snapshot(staging_path)
+        raise
+    finally:
+        scheduler.state_conn.close()
+
+    # Export only what was actually published, with the delta taken against
+    # the snapshot it replaced
+    export_snapshot(version, previous)
@@ -0,0 +1,66 @@
+import glob
+import os
+import time
+
+# Published snapshots are immutable climbing-<version>.db files. CURRENT holds
+# the version being served and is only ever replaced atomically.
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots')
+CURRENT_POINTER = os.path.join(SNAPSHOT_DIR, 'CURRENT')
+
+# Keep a few old snapshots around so the previous version can still be
+# diffed against or rolled back to
+KEEP_SNAPSHOTS = 3
+
+def snapshot_path(version):
+    return os.path.join(SNAPSHOT_DIR, f'climbing-{version}.db')
+
+def new_staging_snapshot():
+    """Reserve a version and return (version, staging path) for a crawl to write into"""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    version = time.strftime('%Y%m%d%H%M%S')
+    staging_path = snapshot_path(version) + '.staging'
+    if os.path.exists(staging_path):
+        os.remove(staging_path)
+    return version, staging_path
+
+def publish_snapshot(staging_path, version):
+    """Move a finished staging database into place and point CURRENT at it.
+    The database connection must be closed before publishing."""
+    final_path = snapshot_path(version)
+    os.replace(staging_path, final_path)
+
+    tmp_pointer = CURRENT_POINTER + '.tmp'
+    with open(tmp_pointer, 'w') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, CURRENT_POINTER)
+
+    prune_snapshots()
+    print(f"Published snapshot {version}")
+    return final_path
+
+def discard_snapshot(staging_path):
+    """Throw away a staging database from a crawl that didn't finish"""
+    for path in (staging_path, staging_path + '.wal'):
+        if os.path.exists(path):
+            os.remove(path)
+
+def current_version():
+    """Version of the published snapshot, or None if nothing has been published"""
+    try:
+        with open(CURRENT_POINTER) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def published_versions():
+    """All published versions, oldest first"""
+    paths = glob.glob(os.path.join(SNAPSHOT_DIR, 'climbing-*.db'))
+    return sorted(os.path.basename(p)[len('climbing-'):-len('.db')] for p in paths)
+
+def prune_snapshots(keep=KEEP_SNAPSHOTS):
+    current = current_version()
+    for version in published_versions()[:-keep]:
+        if version != current:
+            os.remove(snapshot_path(version))
@@ -0,0 +1,61 @@
+import duckdb
+import pytest
+import dataset
+from app import app
+from queries import configure_connection
+from schema import migrate, add_area_to_closure
+
+# Run from backend/src with: python -m pytest
+
+# Upper Peninsula > Marquette > Carp River > Carp Slabs, plus Munising
+AREAS = [(1, 'Upper Peninsula', None), (2, 'Marquette', 1), (3, 'Munising', 1),
+         (4, 'Carp River', 2), (5, 'Carp Slabs', 4)]
+ROUTES = [(10, 1, 'Overlook'), (20, 2, 'Arete'), (30, 3, 'Roof'), (40, 4, 'Dihedral'),
+          (50, 5, 'Slab'), (51, 5, 'Crack')]
+
+@pytest.fixture
+def client(monkeypatch):
+    conn = migrate(duckdb.connect(':memory:'))
+    for area_id, name, parent_id in AREAS:
+        conn.execute('INSERT INTO climbing_areas (id, name, parent_area_id) VALUES (?, ?, ?)',
+                     [area_id, name, parent_id])
+        add_area_to_closure(conn, area_id, parent_id)
+    conn.executemany('INSERT INTO routes (id, area_id, name) VALUES (?, ?, ?)', ROUTES)
+    conn.executemany('INSERT INTO route_photos (id, route_id, url) VALUES (?, ?, ?)',
+                     [(1, 50, 'https://example.com/b.jpg'), (2, 50, 'https://example.com/a.jpg')])
+
+    # Serve the test database instead of loading a published snapshot
+    monkeypatch.setattr(dataset, 'dataset_conn', configure_connection(conn))
+    monkeypatch.setattr(dataset, '_watcher', object())
+    return app.test_client()
+
+def test_area_subtree(client):
+    response = client.get('/api/areas/2/subtree')
+    assert response.status_code == 200
+    assert [(area['id'], area['depth']) for area in response.json['areas']] == [(2, 0), (4, 1), (5, 2)]
+
+def test_area_subtree_not_found(client):
+    assert client.get('/api/areas/99/subtree').status_code == 404
+
+def test_area_routes(client):
+    response = client.get('/api/areas/2/routes')
+    assert [route['id'] for route in response.json['routes']] == [20]
+
+def test_area_routes_recursive(client):
+    response = client.get('/api/areas/2/routes?recursive=1')
+    routes = response.json['routes']
+    assert [route['id'] for route in routes] == [20, 40, 50, 51]
+    photos = {route['id']: [photo['url'] for photo in route['photos']] for route in routes}
+    assert photos[50] == ['https://example.com/a.jpg', 'https://example.com/b.jpg']
+    assert photos[40] == []
+
+    everything = client.get('/api/areas/1/routes?recursive=true').json['routes']
+    assert [route['id'] for route in everything] == [10, 20, 30, 40, 50, 51]
+
+def test_area_routes_not_found(client):
+    assert client.get('/api/areas/99/routes?recursive=1').status_code == 404
+
+def test_routes(client):
+    routes = client.get('/api/routes').json['routes']
+    assert sorted(route['id'] for route in routes) == [10, 20, 30, 40, 50, 51]
+    assert [len(route['photos']) for route in routes if route['id'] == 50] == [2]
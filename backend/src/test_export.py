@@ -0,0 +1,100 @@
+import json
+import os
+import duckdb
+import pytest
+import snapshots
+from export import diff_records, export_snapshot, load_records
+from schema import migrate
+
+# Run from backend/src with: python -m pytest
+
+AREAS = [(1, 'Upper Peninsula', None), (2, 'Marquette', 1), (3, 'Munising', 1)]
+ROUTES = [(10, 2, 'Arete'), (20, 2, 'Dihedral'), (30, 3, 'Roof'), (40, 3, 'Slab')]
+PHOTOS = [(10, 'https://example.com/10.jpg'), (20, 'https://example.com/20.jpg'),
+          (30, 'https://example.com/30.jpg'), (40, 'https://example.com/40.jpg')]
+
+def build_database(conn, areas=AREAS, routes=ROUTES, photos=PHOTOS):
+    migrate(conn)
+    conn.executemany('INSERT INTO climbing_areas (id, name, parent_area_id) VALUES (?, ?, ?)', areas)
+    conn.executemany('INSERT INTO routes (id, area_id, name) VALUES (?, ?, ?)', routes)
+    # Numbered in crawl order like write_records does, so ids shift when a
+    # photo is added
+    conn.executemany('INSERT INTO route_photos (id, route_id, url) VALUES (?, ?, ?)',
+                     [(i, route_id, url) for i, (route_id, url) in enumerate(photos, 1)])
+    return conn
+
+def ids(rows):
+    return sorted(row if isinstance(row, int) else row['id'] for row in rows)
+
+def test_diff_records():
+    old = load_records(build_database(duckdb.connect(':memory:')))
+    new = load_records(build_database(
+        duckdb.connect(':memory:'),
+        areas=[(1, 'Upper Peninsula', None), (2, 'Marquette', 1), (3, 'Pictured Rocks', 1)],
+        routes=[(10, 2, 'Arete'), (20, 2, 'Dihedral'), (30, 3, 'Roof'), (50, 3, 'Chimney')],
+        photos=[PHOTOS[0], (10, 'https://example.com/10b.jpg'), PHOTOS[1], PHOTOS[2]]))
+
+    areas = diff_records(old['areas'], new['areas'])
+    assert (ids(areas['added']), ids(areas['updated']), ids(areas['removed'])) == ([], [3], [])
+
+    routes = diff_records(old['routes'], new['routes'])
+    # The new photo only changes its own route, not every route after it
+    assert (ids(routes['added']), ids(routes['updated']), ids(routes['removed'])) == ([50], [10], [40])
+
+def test_diff_records_unchanged():
+    records = load_records(build_database(duckdb.connect(':memory:')))
+    again = load_records(build_database(duckdb.connect(':memory:')))
+    assert diff_records(records['routes'], again['routes']) == {'added': [], 'updated': [], 'removed': []}
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshots, 'SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    os.makedirs(snapshots.SNAPSHOT_DIR)
+    return snapshots.SNAPSHOT_DIR
+
+def publish(version, **kwargs):
+    conn = build_database(duckdb.connect(snapshots.snapshot_path(version)), **kwargs)
+    conn.close()
+
+def read_json(export_dir, path):
+    with open(os.path.join(export_dir, path)) as f:
+        return json.load(f)
+
+def test_export_manifest(snapshot_dir, tmp_path):
+    export_dir = str(tmp_path / 'public')
+
+    publish('1')
+    export_snapshot('1', None, export_dir)
+    manifest = read_json(export_dir, 'data/manifest.json')
+    assert manifest['version'] == '1'
+    # Nothing to diff the first export against, clients refetch the full file
+    assert manifest['deltas'] == [{'from': None, 'to': '1', 'path': None, 'refetch': True}]
+
+    publish('2', routes=ROUTES[:3], photos=PHOTOS[:3])
+    export_snapshot('2', '1', export_dir)
+    manifest = read_json(export_dir, 'data/manifest.json')
+    assert manifest['version'] == '2'
+    assert manifest['deltas'][-1] == {'from': '1', 'to': '2', 'path': 'data/delta-1-2.json'}
+    delta = read_json(export_dir, manifest['deltas'][-1]['path'])
+    assert delta['routes'] == {'added': [], 'updated': [], 'removed': [40]}
+    assert len(read_json(export_dir, 'climbing_data.json')['routes']) == 3
+
+    # The previous snapshot was pruned, the chain records a refetch for 3
+    publish('3')
+    os.remove(snapshots.snapshot_path('2'))
+    export_snapshot('3', '2', export_dir)
+    manifest = read_json(export_dir, 'data/manifest.json')
+    assert [entry['to'] for entry in manifest['deltas']] == ['1', '2', '3']
+    assert manifest['deltas'][-1] == {'from': '2', 'to': '3', 'path': None, 'refetch': True}
+
+def test_export_prunes_old_deltas(snapshot_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr('export.KEEP_DELTAS', 2)
+    export_dir = str(tmp_path / 'public')
+    for version in range(1, 5):
+        publish(str(version))
+        export_snapshot(str(version), str(version - 1) if version > 1 else None, export_dir)
+
+    manifest = read_json(export_dir, 'data/manifest.json')
+    assert [entry['to'] for entry in manifest['deltas']] == ['3', '4']
+    assert sorted(os.listdir(os.path.join(export_dir, 'data'))) == [
+        'delta-2-3.json', 'delta-3-4.json', 'manifest.json']
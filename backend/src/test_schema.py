@@ -0,0 +1,92 @@
+import duckdb
+import pytest
+import schema
+from schema import migrate, add_area_to_closure, parse_feet, parse_route_type, parse_pitches
+
+# Run from backend/src with: python -m pytest
+
+@pytest.mark.parametrize('text, expected', [
+    ('80 ft', 80.0),
+    ('80 ft (24 m)', 80.0),
+    ('1,200 ft', 1200.0),
+    ('1,200 feet', 1200.0),
+    ("45'", 45.0),
+    ('35', 35.0),
+    ('12.5 ft', 12.5),
+    ('30 m', 98.4),
+    ('30 meters', 98.4),
+    ('30 metres', 98.4),
+    ('Summer, 600 ft', 600.0),
+    ('approx., 100 ft', 100.0),
+    (120, 120.0),
+    (3.5, 3.5),
+])
+def test_parse_feet(text, expected):
+    assert parse_feet(text) == expected
+
+@pytest.mark.parametrize('text', [None, '', 'Summer, Fall', ',', 'unknown'])
+def test_parse_feet_without_a_number(text):
+    assert parse_feet(text) is None
+
+@pytest.mark.parametrize('text, expected', [
+    ('Trad', 'trad'),
+    ('Sport', 'sport'),
+    ('TR', 'tr'),
+    ('Top Rope', 'tr'),
+    ('Trad, Sport, TR', 'trad'),
+    ('sport, trad', 'sport'),
+    ('Aid/Trad', 'aid'),
+    ('Trad, Alpine, Grade III', 'trad'),
+    ('Ice, Mixed', 'ice'),
+    ('Boulder', 'boulder'),
+    ('Grade II', 'other'),
+    ('', None),
+    (None, None),
+])
+def test_parse_route_type(text, expected):
+    assert parse_route_type(text) == expected
+
+@pytest.mark.parametrize('value, expected', [
+    (3, 3),
+    ('2', 2),
+    (0, 0),
+    ('', None),
+    (None, None),
+    ('two', None),
+    ('1.5', None),
+])
+def test_parse_pitches(value, expected):
+    assert parse_pitches(value) == expected
+
+# A root with areas up to three levels below it
+TREE = [(1, None), (2, 1), (3, 1), (4, 2), (5, 2), (6, 3), (7, 4), (8, 4), (9, 6)]
+
+def closure_rows(conn):
+    return conn.execute('''
+        SELECT ancestor_id, descendant_id, depth FROM area_closure ORDER BY ALL
+    ''').fetchall()
+
+def test_add_area_to_closure_matches_backfill(monkeypatch):
+    incremental = migrate(duckdb.connect(':memory:'))
+    for area_id, parent_id in TREE:
+        incremental.execute('INSERT INTO climbing_areas (id, name, parent_area_id) VALUES (?, ?, ?)',
+                            [area_id, f'Area {area_id}', parent_id])
+        add_area_to_closure(incremental, area_id, parent_id)
+
+    # The same tree in a database from before migration 3, then backfilled
+    # by it from the parent links
+    backfilled = duckdb.connect(':memory:')
+    monkeypatch.setattr(schema, 'MIGRATIONS', schema.MIGRATIONS[:2])
+    migrate(backfilled)
+    for area_id, parent_id in TREE:
+        backfilled.execute('INSERT INTO climbing_areas (id, name, parent_area_id) VALUES (?, ?, ?)',
+                           [area_id, f'Area {area_id}', parent_id])
+    monkeypatch.undo()
+    migrate(backfilled)
+
+    rows = closure_rows(incremental)
+    assert rows == closure_rows(backfilled)
+    assert (1, 9, 3) in rows and (2, 8, 2) in rows and (3, 9, 2) in rows
+    # Every area is its own descendant, and nothing links across branches
+    assert all((area_id, area_id, 0) in rows for area_id, _ in TREE)
+    assert not any(ancestor == 2 and descendant in (3, 6, 9) for ancestor, descendant, _ in rows)
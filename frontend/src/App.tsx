@@ -19,6 +19,7 @@ document.head.appendChild(globalStyles);
 interface Photo {
   url: string;
   caption: string;
+  thumbnail: string | null;
 }
 
 interface Route {
@@ -27,7 +28,7 @@ interface Route {
   name: string;
   grade: string;
   type: string;
-  height: string;
+  height: number | null;
   pitches: number;
   first_ascent: string;
   description: string;
@@ -47,10 +48,10 @@ interface ClimbingArea {
   latitude: number | null
   longitude: number | null
   type: string | null
-  elevation: string | null
+  elevation: number | null
   season: string
   approach_time: string
-  parent_area_id: string
+  parent_area_id: number | null
   route_count: number
   routes?: Route[]
 }
@@ -238,7 +239,7 @@ function App() {
             {expandedAreas.has(area.id) && (
               <div className="area-details">
                 {area.type && <p>Type: {area.type}</p>}
-                {area.elevation && <p>Elevation: {area.elevation}</p>}
+                {area.elevation && <p>Elevation: {area.elevation} ft</p>}
                 {area.season && <p>Season: {area.season}</p>}
                 {area.approach_time && <p>Approach: {area.approach_time}</p>}
                 {area.latitude && area.longitude && (
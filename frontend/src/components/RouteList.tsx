@@ -3,6 +3,7 @@ import React from 'react';
 interface Photo {
   url: string;
   caption: string;
+  thumbnail: string | null;
 }
 
 interface Route {
@@ -11,7 +12,7 @@ interface Route {
   name: string;
   grade: string;
   type: string;
-  height: string;
+  height: number | null;
   pitches: number;
   first_ascent: string;
   description: string;
@@ -54,7 +55,7 @@ export const RouteList: React.FC<RouteListProps> = ({ routes, areaId }) => {
             {route.height && (
               <p>
                 <strong>Height:</strong>
-                {route.height}
+                {route.height} ft
               </p>
             )}
             {route.pitches > 0 && (
@@ -95,7 +96,7 @@ export const RouteList: React.FC<RouteListProps> = ({ routes, areaId }) => {
             <div className="route-photos">
               {route.photos.map((photo, index) => (
                 <figure key={index} className="route-photo">
-                  <img src={photo.url} alt={photo.caption || route.name} loading="lazy" />
+                  <img src={photo.thumbnail ?? photo.url} alt={photo.caption || route.name} loading="lazy" />
                   {photo.caption && <figcaption>{photo.caption}</figcaption>}
                 </figure>
               ))}